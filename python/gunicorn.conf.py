@@ -0,0 +1,17 @@
+# Run from the python/ directory with: gunicorn
+
+wsgi_app = "wsgi:app"
+pythonpath = "src"
+bind = "0.0.0.0:5000"
+
+# gevent workers let each process serve many concurrent requests
+worker_class = "gevent"
+workers = 4
+worker_connections = 1000
+
+
+def on_starting(server):
+    """Initialize the database once in the master, before workers fork"""
+    from db import init_db
+
+    init_db()
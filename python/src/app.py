@@ -2,8 +2,12 @@ from flask import Flask
 from routes.tasks import tasks_bp
 from routes.users import users_bp
 from db import init_db
+from serialization import MAX_JSON_BODY, OrjsonProvider
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+# Also caps bodies sent without a Content-Length header
+app.config["MAX_CONTENT_LENGTH"] = MAX_JSON_BODY
 
 
 # Register blueprints
@@ -23,8 +27,6 @@ def health():
 
 if __name__ == "__main__":
     # Initialize database on startup
-    import asyncio
-
-    asyncio.run(init_db())
+    init_db()
 
     app.run(debug=True, host="0.0.0.0", port=5000)
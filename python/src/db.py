@@ -1,34 +1,210 @@
-import aiosqlite
 import os
-from typing import Optional
+import queue
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional, Sequence
 
 # Database configuration - use environment variables in production
 DB_NAME = "taskflow.db"
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", DB_NAME)
+# Number of reader connections per process; match the worker's thread count
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+# Prepared statements kept per connection (sqlite3 defaults to 128)
+DB_STATEMENT_CACHE_SIZE = 256
 
+# Applied once to every sync connection when it is opened
+SYNC_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+)
 
-async def get_connection() -> aiosqlite.Connection:
+
+# Current UTC time as an ISO 8601 string, matching utc_now()
+SQL_NOW = "strftime('%Y-%m-%dT%H:%M:%S', 'now')"
+
+# Per-table write counters that version the cached list responses
+_VERSION_SQL = "SELECT version FROM table_versions WHERE name = ?"
+_BUMP_VERSION_SQL = "UPDATE table_versions SET version = version + 1 WHERE name = ?"
+_LAST_ID_SQL = "SELECT seq FROM sqlite_sequence WHERE name = ?"
+
+_SAMPLE_PASSWORD_HASH = (
+    "abc123:5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8"
+)
+
+# (id, username, email, password_hash, first_name, last_name, is_active)
+SAMPLE_USERS = [
+    (1, "john_doe", "john@example.com", _SAMPLE_PASSWORD_HASH, "John", "Doe", 1),
+    (2, "jane_smith", "jane@example.com", _SAMPLE_PASSWORD_HASH, "Jane", "Smith", 1),
+    (3, "bob_johnson", "bob@example.com", _SAMPLE_PASSWORD_HASH, "Bob", "Johnson", 1),
+]
+
+# (id, title, description, status, priority, due_date, user_id)
+# fmt: off
+SAMPLE_TASKS = [
+    (1, "Fix login bug", "Users cannot login with special characters", "in_progress", "high", "2025-10-20T10:00:00", 1),
+    (2, "Update documentation", "Add API examples to README", "pending", "medium", "2025-10-25T15:00:00", 2),
+    (3, "Review Q4 report", "Financial review for Q4 2024", "completed", "high", "2025-10-15T09:00:00", 1),
+    (4, "Design new homepage", "Mockups for redesign", "pending", "low", "2025-11-01T12:00:00", 3),
+    (5, "Setup CI/CD pipeline", "Configure GitHub Actions", "pending", "high", "2025-10-10T14:00:00", 2),
+    (6, "Refactor user service", "Clean up legacy code", "pending", "medium", "2025-10-22T16:00:00", None),
+]
+# fmt: on
+
+
+class ConnectionPool:
+    """
+    Pool of sync SQLite connections shared by the models.
+
+    Reads check out one of up to `size` reader connections; writes go through
+    a single writer connection behind a lock, since WAL allows many readers
+    but only one writer at a time. Connections are opened lazily, kept open
+    for the life of the process and are not health-checked on checkout.
+    """
+
+    def __init__(self, path: str, size: int) -> None:
+        self.path = path
+        self.size = size
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._opened = 0
+        self._writer: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in SYNC_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def acquire(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check out a reader connection, blocking while all of them are in use.
+
+        Yields:
+            sqlite3.Connection: Reader connection with Row factory
+        """
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            conn = self._connect() if can_open else self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """
+        Run a write on the writer connection; commits on success, rolls back on error.
+
+        Yields:
+            sqlite3.Connection: Writer connection with Row factory
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+
+
+pool = ConnectionPool(DB_PATH, DB_POOL_SIZE)
+
+
+def utc_now() -> str:
+    """Current UTC time as a naive ISO 8601 string, the format stored in the DB"""
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def bump_version(conn: sqlite3.Connection, table: str) -> None:
     """
-    Get async database connection.
+    Increment a table's write counter.
+
+    Call on the pool.write() connection so the bump commits with the write;
+    SQLite serializes writers across processes, so versions never go back.
+    """
+    conn.execute(_BUMP_VERSION_SQL, (table,))
+
+
+def upsert_many(table: str, upsert_sql: str, records: Sequence[Any]) -> str:
+    """
+    Upsert model objects with executemany() in a single write transaction.
+
+    Records without an id are inserted and get their new id assigned.
+
+    Args:
+        table: Table name, used for the id sequence and its write counter
+        upsert_sql: INSERT ... ON CONFLICT(id) statement without RETURNING
+        records: Objects with an `id` and a `_db_values(now)` method
 
     Returns:
-        aiosqlite.Connection: Async database connection with Row factory
+        str: updated_at timestamp written to every row
     """
-    conn = await aiosqlite.connect(DB_PATH)
-    conn.row_factory = aiosqlite.Row
-    return conn
+    new_records = [r for r in records if not r.id]
+    existing_records = [r for r in records if r.id]
+
+    with pool.write() as conn:
+        now = utc_now()
+        cursor = conn.cursor()
+        if new_records:
+            cursor.executemany(upsert_sql, [r._db_values(now) for r in new_records])
+            # The transaction holds the write lock, so the new rows got
+            # consecutive ids ending at the current AUTOINCREMENT value
+            cursor.execute(_LAST_ID_SQL, (table,))
+            first_id = cursor.fetchone()[0] - len(new_records) + 1
+            for offset, record in enumerate(new_records):
+                record.id = first_id + offset
+        if existing_records:
+            cursor.executemany(
+                upsert_sql, [r._db_values(now) for r in existing_records]
+            )
+        bump_version(conn, table)
+    return now
 
 
-async def init_db() -> None:
+def get_version(table: str) -> int:
     """
-    Initialize database with schema and sample data using async operations.
+    Read a table's write counter.
+
+    Returns:
+        int: Number of write transactions that changed the table
+    """
+    with pool.acquire() as conn:
+        return conn.execute(_VERSION_SQL, (table,)).fetchone()[0]
+
+
+def init_db() -> None:
+    """
+    Initialize database with schema and sample data.
     All queries use parameterized statements for security.
+
+    Runs once at startup, so it uses its own plain connection rather than
+    the pool (which must not be opened before gunicorn forks workers).
     """
-    async with aiosqlite.connect(DB_PATH) as conn:
-        conn.row_factory = aiosqlite.Row
+    with closing(sqlite3.connect(DB_PATH)) as conn:
+        # sqlite3 runs DDL in autocommit mode, so open the transaction
+        # explicitly to commit schema and seed data together
+        conn.execute("BEGIN")
 
         # Create users table
-        await conn.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -47,7 +223,7 @@ async def init_db() -> None:
         )
 
         # Create tasks table
-        await conn.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS tasks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -64,47 +240,68 @@ async def init_db() -> None:
         """
         )
 
+        # Indexes for task filtering and api key lookups. username and email
+        # are already covered by the implicit indexes of their UNIQUE columns.
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_tasks_filter
+            ON tasks (deleted_at, user_id, status, created_at DESC)
+        """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_users_api_key
+            ON users (api_key) WHERE api_key IS NOT NULL
+        """
+        )
+
+        # Write counters for bump_version() / get_version()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS table_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO table_versions (name) VALUES ('tasks'), ('users')"
+        )
+
         # Check if users exist
-        cursor = await conn.execute("SELECT COUNT(*) FROM users")
-        row = await cursor.fetchone()
+        cursor = conn.execute("SELECT COUNT(*) FROM users")
+        row = cursor.fetchone()
         user_count = row[0] if row else 0
 
         if user_count == 0:
-            # Insert sample users using parameterized query
             # Note: password hashes are for "password123"
-            await conn.execute(
-                """
-                INSERT INTO users (id, username, email, password_hash, first_name, last_name, is_active, created_at, updated_at) VALUES
-                (1, 'john_doe', 'john@example.com', 'abc123:5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8', 'John', 'Doe', 1, datetime('now'), datetime('now')),
-                (2, 'jane_smith', 'jane@example.com', 'abc123:5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8', 'Jane', 'Smith', 1, datetime('now'), datetime('now')),
-                (3, 'bob_johnson', 'bob@example.com', 'abc123:5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8', 'Bob', 'Johnson', 1, datetime('now'), datetime('now'))
-            """
+            conn.executemany(
+                f"""
+                INSERT INTO users (id, username, email, password_hash, first_name,
+                                   last_name, is_active, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, {SQL_NOW}, {SQL_NOW})
+            """,
+                SAMPLE_USERS,
             )
 
         # Check if tasks exist
-        cursor = await conn.execute("SELECT COUNT(*) FROM tasks")
-        row = await cursor.fetchone()
+        cursor = conn.execute("SELECT COUNT(*) FROM tasks")
+        row = cursor.fetchone()
         task_count = row[0] if row else 0
 
         if task_count == 0:
-            # Insert sample tasks using parameterized query
-            await conn.execute(
-                """
-                INSERT INTO tasks (id, title, description, status, priority, due_date, user_id, created_at, updated_at) VALUES
-                (1, 'Fix login bug', 'Users cannot login with special characters', 'in_progress', 'high', '2025-10-20 10:00:00', 1, datetime('now'), datetime('now')),
-                (2, 'Update documentation', 'Add API examples to README', 'pending', 'medium', '2025-10-25 15:00:00', 2, datetime('now'), datetime('now')),
-                (3, 'Review Q4 report', 'Financial review for Q4 2024', 'completed', 'high', '2025-10-15 09:00:00', 1, datetime('now'), datetime('now')),
-                (4, 'Design new homepage', 'Mockups for redesign', 'pending', 'low', '2025-11-01 12:00:00', 3, datetime('now'), datetime('now')),
-                (5, 'Setup CI/CD pipeline', 'Configure GitHub Actions', 'pending', 'high', '2025-10-10 14:00:00', 2, datetime('now'), datetime('now')),
-                (6, 'Refactor user service', 'Clean up legacy code', 'pending', 'medium', '2025-10-22 16:00:00', NULL, datetime('now'), datetime('now'))
-            """
+            conn.executemany(
+                f"""
+                INSERT INTO tasks (id, title, description, status, priority,
+                                   due_date, user_id, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, {SQL_NOW}, {SQL_NOW})
+            """,
+                SAMPLE_TASKS,
             )
 
-        await conn.commit()
+        conn.commit()
         print(f"Database initialized at {DB_PATH}")
 
 
 if __name__ == "__main__":
-    import asyncio
-
-    asyncio.run(init_db())
+    init_db()
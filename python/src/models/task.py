@@ -1,10 +1,75 @@
-import sqlite3
-from datetime import datetime
+from datetime import datetime, timezone
+from cachetools import TTLCache
+from db import bump_version, get_version, pool, upsert_many, utc_now
 from typing import Optional, Any
+import itertools
 import json
+import threading
+
+VALID_STATUSES = frozenset({"pending", "in_progress", "completed", "cancelled"})
+VALID_PRIORITIES = frozenset({"low", "medium", "high", "urgent"})
+
+# Tasks change often, so cached rows only live for a few seconds. save() and
+# delete() only evict in their own process, so with several gunicorn workers
+# the other workers can serve a stale or deleted task for up to the 5s ttl.
+# Only reads use it; read-modify-write paths pass use_cache=False.
+_rows_by_id = TTLCache(maxsize=10_000, ttl=5)
+_cache_lock = threading.Lock()
+
+# Inserts when id is NULL, otherwise updates the existing row in place
+_UPSERT_SQL = """
+    INSERT INTO tasks (id, title, description, status, priority,
+                       due_date, user_id, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        title=excluded.title, description=excluded.description,
+        status=excluded.status, priority=excluded.priority,
+        due_date=excluded.due_date, user_id=excluded.user_id,
+        updated_at=excluded.updated_at
+"""
+_UPSERT_RETURNING_ID_SQL = _UPSERT_SQL + " RETURNING id"
+
+_FIND_BY_ID_SQL = "SELECT * FROM tasks WHERE id = ? AND deleted_at IS NULL"
+_DELETE_SQL = "UPDATE tasks SET deleted_at = ?, updated_at = ? WHERE id = ?"
+
+
+def _build_find_all_sql(by_user, by_status, by_priority, after):
+    conditions = ["deleted_at IS NULL"]
+    if by_user:
+        conditions.append("user_id = ?")
+    if by_status:
+        conditions.append("status = ?")
+    if by_priority:
+        conditions.append("priority = ?")
+    if after:
+        conditions.append("(created_at, id) < (?, ?)")
+    return (
+        f"SELECT * FROM tasks WHERE {' AND '.join(conditions)} "
+        "ORDER BY created_at DESC, id DESC LIMIT ?"
+    )
+
+
+# Task.find_all statements keyed by which of (user_id, status, priority,
+# after) are given
+_FIND_ALL_SQL = {
+    key: _build_find_all_sql(*key) for key in itertools.product((False, True), repeat=4)
+}
 
 
 class Task:
+    # Columns exposed by to_dict(), in output order
+    PUBLIC_FIELDS = (
+        "id",
+        "title",
+        "description",
+        "status",
+        "priority",
+        "due_date",
+        "user_id",
+        "created_at",
+        "updated_at",
+    )
+
     def __init__(
         self,
         id=None,
@@ -23,112 +88,111 @@ class Task:
         self.priority = priority  # low, medium, high, urgent
         self.due_date = due_date
         self.user_id = user_id
-        self.created_at = created_at or datetime.now()
+        self.created_at = created_at or utc_now()
         self.updated_at = None
         self.deleted_at = None
 
-    def save(self):
-        conn = sqlite3.connect("taskflow.db")
-        cursor = conn.cursor()
-
-        # Create table if not exists
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                status TEXT DEFAULT 'pending',
-                priority TEXT DEFAULT 'medium',
-                due_date TEXT,
-                user_id INTEGER,
-                created_at TEXT,
-                updated_at TEXT,
-                deleted_at TEXT
-            )
-        """
+    def _db_values(self, now):
+        """Column values in _UPSERT_SQL parameter order"""
+        return (
+            self.id,
+            self.title,
+            self.description,
+            self.status,
+            self.priority,
+            self.due_date,
+            self.user_id,
+            self.created_at,
+            now,
         )
 
-        if self.id:
-            # Update existing task
-            cursor.execute(
-                """
-                UPDATE tasks SET 
-                    title=?, description=?, status=?, priority=?, 
-                    due_date=?, user_id=?, updated_at=?
-                WHERE id=?
-            """,
-                (
-                    self.title,
-                    self.description,
-                    self.status,
-                    self.priority,
-                    self.due_date.isoformat() if self.due_date else None,
-                    self.user_id,
-                    datetime.now().isoformat(),
-                    self.id,
-                ),
-            )
-        else:
-            # Insert new task
-            cursor.execute(
-                """
-                INSERT INTO tasks (title, description, status, priority, 
-                                 due_date, user_id, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    self.title,
-                    self.description,
-                    self.status,
-                    self.priority,
-                    self.due_date.isoformat() if self.due_date else None,
-                    self.user_id,
-                    self.created_at.isoformat(),
-                    datetime.now().isoformat(),
-                ),
-            )
-            self.id = cursor.lastrowid
-
-        conn.commit()
-        conn.close()
+    def save(self):
+        # Single upsert: inserts when id is None, updates an existing row otherwise
+        with pool.write() as conn:
+            now = utc_now()
+            cursor = conn.cursor()
+            cursor.execute(_UPSERT_RETURNING_ID_SQL, self._db_values(now))
+            self.id = cursor.fetchone()[0]
+            bump_version(conn, "tasks")
+        self.updated_at = now
+
+        with _cache_lock:
+            _rows_by_id.pop(self.id, None)
         return self
 
     @classmethod
-    def find_by_id(cls, task_id):
-        conn = sqlite3.connect("taskflow.db")
-        cursor = conn.cursor()
+    def save_many(cls, tasks):
+        """Save many tasks in one transaction using executemany()"""
+        now = upsert_many("tasks", _UPSERT_SQL, tasks)
 
-        cursor.execute(
-            f"SELECT * FROM tasks WHERE id = {task_id} AND deleted_at IS NULL"
-        )
-        row = cursor.fetchone()
-        conn.close()
+        with _cache_lock:
+            for task in tasks:
+                task.updated_at = now
+                _rows_by_id.pop(task.id, None)
+        return tasks
+
+    @classmethod
+    def find_by_id(cls, task_id, use_cache=True):
+        """Find a live task; pass use_cache=False to always read the database"""
+        if use_cache:
+            with _cache_lock:
+                row = _rows_by_id.get(task_id)
+            if row:
+                return cls._from_row(row)
+
+        with pool.acquire() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(_FIND_BY_ID_SQL, (task_id,))
+            row = cursor.fetchone()
 
         if row:
+            with _cache_lock:
+                _rows_by_id[row["id"]] = row
             return cls._from_row(row)
         return None
 
     @classmethod
-    def find_all(cls, user_id=None, status=None):
-        conn = sqlite3.connect("taskflow.db")
-        cursor = conn.cursor()
-
-        query = "SELECT * FROM tasks WHERE deleted_at IS NULL"
+    def find_all(cls, user_id=None, status=None, priority=None, limit=None, after=None):
+        """Find tasks newest first; `after` is a (created_at, id) keyset position"""
+        rows = cls.find_all_rows(
+            user_id=user_id, status=status, priority=priority, limit=limit, after=after
+        )
+        return [cls._from_row(row) for row in rows]
 
+    @classmethod
+    def find_all_rows(
+        cls, user_id=None, status=None, priority=None, limit=None, after=None
+    ):
+        """Same as find_all() but returns raw sqlite3.Row objects"""
+        # Only bind the filters that are set, so each combination hits its own
+        # precompiled statement and SQLite can use idx_tasks_filter
+        params = []
         if user_id:
-            query += f" AND user_id = {user_id}"
-
+            params.append(user_id)
         if status:
-            query += f" AND status = '{status}'"
-
-        query += " ORDER BY created_at DESC"
+            params.append(status)
+        if priority:
+            params.append(priority)
+        if after:
+            params.extend(after)
+        params.append(limit if limit is not None else -1)
+        sql = _FIND_ALL_SQL[(bool(user_id), bool(status), bool(priority), bool(after))]
+
+        with pool.acquire() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return cursor.fetchall()
 
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        conn.close()
+    @classmethod
+    def list_version(cls):
+        """Write counter of the tasks table; bumped by every save and delete"""
+        return get_version("tasks")
 
-        return [cls._from_row(row) for row in rows]
+    @classmethod
+    def rows_to_dicts(cls, rows):
+        """Convert database rows straight to API dicts, skipping Task hydration"""
+        return [{field: row[field] for field in cls.PUBLIC_FIELDS} for row in rows]
 
     @classmethod
     def _from_row(cls, row):
@@ -139,27 +203,26 @@ class Task:
             description=row[2],
             status=row[3],
             priority=row[4],
-            due_date=datetime.fromisoformat(row[5]) if row[5] else None,
+            due_date=row[5],
             user_id=row[6],
-            created_at=datetime.fromisoformat(row[7]) if row[7] else None,
+            created_at=row[7],
         )
-        task.updated_at = datetime.fromisoformat(row[8]) if row[8] else None
-        task.deleted_at = datetime.fromisoformat(row[9]) if row[9] else None
+        task.updated_at = row[8]
+        task.deleted_at = row[9]
         return task
 
     def delete(self):
-        conn = sqlite3.connect("taskflow.db")
-        cursor = conn.cursor()
+        with pool.write() as conn:
+            now = utc_now()
+            cursor = conn.cursor()
 
-        cursor.execute(
-            f"""
-            UPDATE tasks SET deleted_at = '{datetime.now().isoformat()}' WHERE id = {self.id}
-        """
-        )
+            cursor.execute(_DELETE_SQL, (now, now, self.id))
+            bump_version(conn, "tasks")
 
-        conn.commit()
-        conn.close()
-        self.deleted_at = datetime.now()
+        with _cache_lock:
+            _rows_by_id.pop(self.id, None)
+        self.deleted_at = now
+        self.updated_at = now
 
     def to_dict(self):
         """Convert to dictionary for JSON serialization"""
@@ -169,10 +232,10 @@ class Task:
             "description": self.description,
             "status": self.status,
             "priority": self.priority,
-            "due_date": self.due_date.isoformat() if self.due_date else None,
+            "due_date": self.due_date,
             "user_id": self.user_id,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
 
     def validate(self):
@@ -184,14 +247,23 @@ class Task:
         if len(self.title) > 200:
             errors.append("Title must be less than 200 characters")
 
-        if self.status not in ["pending", "in_progress", "completed", "cancelled"]:
+        if self.status not in VALID_STATUSES:
             errors.append("Invalid status")
 
-        if self.priority not in ["low", "medium", "high", "urgent"]:
+        if self.priority not in VALID_PRIORITIES:
             errors.append("Invalid priority")
 
-        if self.due_date and self.due_date < datetime.now():
-            errors.append("Due date cannot be in the past")
+        # Timestamps are kept as ISO strings; only parse where we compare them
+        if self.due_date:
+            try:
+                due_date = datetime.fromisoformat(self.due_date)
+            except (ValueError, TypeError):
+                errors.append("Due date must be an ISO 8601 datetime")
+            else:
+                # Offset-aware dates can only be compared with an aware now
+                now = datetime.now(timezone.utc) if due_date.tzinfo else datetime.now()
+                if due_date < now:
+                    errors.append("Due date cannot be in the past")
 
         return errors
 
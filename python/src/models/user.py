@@ -1,10 +1,90 @@
-import sqlite3
-from datetime import datetime
+from cachetools import TTLCache
+from db import bump_version, get_version, pool, upsert_many, utc_now
 import hashlib
+import hmac
 import secrets
+import threading
+
+# scrypt cost parameters (~16 MiB of memory per hash)
+SCRYPT_N = 2**14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_PREFIX = "scrypt"
+# Legacy sha256 hashes wrapped in scrypt by rehash.py
+WRAPPED_PREFIX = "scrypt-sha256"
+
+# Short-lived caches for the per-request auth lookups. Rows are cached by id;
+# api keys map to an id and are re-checked against the cached row. save()
+# only evicts in its own process, so with several gunicorn workers a rotated
+# key or a deactivated user can still authenticate in the other workers
+# until the entry expires (up to the 60s ttl).
+_rows_by_id = TTLCache(maxsize=10_000, ttl=60)
+_ids_by_api_key = TTLCache(maxsize=10_000, ttl=60)
+_cache_lock = threading.Lock()
+
+# Inserts when id is NULL, otherwise updates the existing row in place
+_UPSERT_SQL = """
+    INSERT INTO users (id, username, email, password_hash, first_name,
+                       last_name, is_active, created_at, updated_at,
+                       last_login, api_key)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        username=excluded.username, email=excluded.email,
+        password_hash=excluded.password_hash,
+        first_name=excluded.first_name, last_name=excluded.last_name,
+        is_active=excluded.is_active, updated_at=excluded.updated_at,
+        last_login=excluded.last_login, api_key=excluded.api_key
+"""
+_UPSERT_RETURNING_ID_SQL = _UPSERT_SQL + " RETURNING id"
+
+_FIND_BY_ID_SQL = "SELECT * FROM users WHERE id = ?"
+_FIND_BY_USERNAME_SQL = "SELECT * FROM users WHERE username = ?"
+_FIND_BY_EMAIL_SQL = "SELECT * FROM users WHERE email = ?"
+_FIND_BY_API_KEY_SQL = "SELECT * FROM users WHERE api_key = ?"
+
+
+def _scrypt(password, salt):
+    return hashlib.scrypt(
+        password.encode(), salt=salt.encode(), n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P
+    ).hex()
+
+
+def _legacy_sha256(password, salt):
+    h = hashlib.sha256(password.encode())
+    h.update(salt.encode())
+    return h.hexdigest()
+
+
+def is_legacy_hash(password_hash):
+    """True for old "salt:sha256(password + salt)" hashes"""
+    return (
+        bool(password_hash)
+        and ":" in password_hash
+        and not password_hash.startswith((f"{SCRYPT_PREFIX}:", f"{WRAPPED_PREFIX}:"))
+    )
+
+
+def wrap_legacy_hash(password_hash):
+    """Upgrade a legacy hash to scrypt(sha256 hash) without knowing the password"""
+    legacy_salt, legacy_hash = password_hash.split(":", 1)
+    salt = secrets.token_hex(16)
+    return f"{WRAPPED_PREFIX}:{legacy_salt}:{salt}:{_scrypt(legacy_hash, salt)}"
 
 
 class User:
+    # Columns exposed by to_dict(), in output order
+    PUBLIC_FIELDS = (
+        "id",
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "is_active",
+        "created_at",
+        "updated_at",
+        "last_login",
+    )
+
     def __init__(
         self,
         id=None,
@@ -23,103 +103,78 @@ class User:
         self.first_name = first_name
         self.last_name = last_name
         self.is_active = is_active
-        self.created_at = created_at or datetime.now()
+        self.created_at = created_at or utc_now()
         self.updated_at = None
         self.last_login = None
         self.api_key = None
 
-    def save(self):
-        conn = sqlite3.connect("taskflow.db")
-        cursor = conn.cursor()
-
-        # Create table if not exists
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                first_name TEXT,
-                last_name TEXT,
-                is_active INTEGER DEFAULT 1,
-                created_at TEXT,
-                updated_at TEXT,
-                last_login TEXT,
-                api_key TEXT
-            )
-        """
+    def _db_values(self, now):
+        """Column values in _UPSERT_SQL parameter order"""
+        return (
+            self.id,
+            self.username,
+            self.email,
+            self.password_hash,
+            self.first_name,
+            self.last_name,
+            1 if self.is_active else 0,
+            self.created_at,
+            now,
+            self.last_login,
+            self.api_key,
         )
 
-        if self.id:
-            # Update existing user
-            cursor.execute(
-                """
-                UPDATE users SET 
-                    username=?, email=?, password_hash=?, first_name=?, 
-                    last_name=?, is_active=?, updated_at=?, last_login=?, api_key=?
-                WHERE id=?
-            """,
-                (
-                    self.username,
-                    self.email,
-                    self.password_hash,
-                    self.first_name,
-                    self.last_name,
-                    1 if self.is_active else 0,
-                    datetime.now().isoformat(),
-                    self.last_login.isoformat() if self.last_login else None,
-                    self.api_key,
-                    self.id,
-                ),
-            )
-        else:
-            # Insert new user
-            cursor.execute(
-                """
-                INSERT INTO users (username, email, password_hash, first_name, 
-                                 last_name, is_active, created_at, updated_at, api_key)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    self.username,
-                    self.email,
-                    self.password_hash,
-                    self.first_name,
-                    self.last_name,
-                    1 if self.is_active else 0,
-                    self.created_at.isoformat(),
-                    datetime.now().isoformat(),
-                    self.api_key,
-                ),
-            )
-            self.id = cursor.lastrowid
-
-        conn.commit()
-        conn.close()
+    def save(self):
+        # Single upsert: inserts when id is None, updates an existing row otherwise
+        with pool.write() as conn:
+            now = utc_now()
+            cursor = conn.cursor()
+            cursor.execute(_UPSERT_RETURNING_ID_SQL, self._db_values(now))
+            self.id = cursor.fetchone()[0]
+            bump_version(conn, "users")
+        self.updated_at = now
+
+        with _cache_lock:
+            _rows_by_id.pop(self.id, None)
         return self
 
+    @classmethod
+    def save_many(cls, users):
+        """Save many users in one transaction using executemany()"""
+        now = upsert_many("users", _UPSERT_SQL, users)
+
+        with _cache_lock:
+            for user in users:
+                user.updated_at = now
+                _rows_by_id.pop(user.id, None)
+        return users
+
     @classmethod
     def find_by_id(cls, user_id):
-        conn = sqlite3.connect("taskflow.db")
-        cursor = conn.cursor()
+        with _cache_lock:
+            row = _rows_by_id.get(user_id)
+        if row:
+            return cls._from_row(row)
 
-        cursor.execute(f"SELECT * FROM users WHERE id = {user_id}")
-        row = cursor.fetchone()
-        conn.close()
+        with pool.acquire() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(_FIND_BY_ID_SQL, (user_id,))
+            row = cursor.fetchone()
 
         if row:
+            with _cache_lock:
+                _rows_by_id[row["id"]] = row
             return cls._from_row(row)
         return None
 
     @classmethod
     def find_by_username(cls, username):
-        conn = sqlite3.connect("taskflow.db")
-        cursor = conn.cursor()
+        with pool.acquire() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(f"SELECT * FROM users WHERE username = '{username}'")
-        row = cursor.fetchone()
-        conn.close()
+            cursor.execute(_FIND_BY_USERNAME_SQL, (username,))
+            row = cursor.fetchone()
 
         if row:
             return cls._from_row(row)
@@ -127,12 +182,11 @@ class User:
 
     @classmethod
     def find_by_email(cls, email):
-        conn = sqlite3.connect("taskflow.db")
-        cursor = conn.cursor()
+        with pool.acquire() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(f"SELECT * FROM users WHERE email = '{email}'")
-        row = cursor.fetchone()
-        conn.close()
+            cursor.execute(_FIND_BY_EMAIL_SQL, (email,))
+            row = cursor.fetchone()
 
         if row:
             return cls._from_row(row)
@@ -140,14 +194,21 @@ class User:
 
     @classmethod
     def find_by_api_key(cls, api_key):
-        conn = sqlite3.connect("taskflow.db")
-        cursor = conn.cursor()
+        with _cache_lock:
+            row = _rows_by_id.get(_ids_by_api_key.get(api_key))
+        if row and row["api_key"] == api_key:
+            return cls._from_row(row)
+
+        with pool.acquire() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(f"SELECT * FROM users WHERE api_key = '{api_key}'")
-        row = cursor.fetchone()
-        conn.close()
+            cursor.execute(_FIND_BY_API_KEY_SQL, (api_key,))
+            row = cursor.fetchone()
 
         if row:
+            with _cache_lock:
+                _rows_by_id[row["id"]] = row
+                _ids_by_api_key[api_key] = row["id"]
             return cls._from_row(row)
         return None
 
@@ -162,25 +223,47 @@ class User:
             first_name=row[4],
             last_name=row[5],
             is_active=bool(row[6]),
-            created_at=datetime.fromisoformat(row[7]) if row[7] else None,
+            created_at=row[7],
         )
-        user.updated_at = datetime.fromisoformat(row[8]) if row[8] else None
-        user.last_login = datetime.fromisoformat(row[9]) if row[9] else None
+        user.updated_at = row[8]
+        user.last_login = row[9]
         user.api_key = row[10]
         return user
 
+    @classmethod
+    def list_version(cls):
+        """Write counter of the users table; bumped by every save"""
+        return get_version("users")
+
+    @classmethod
+    def rows_to_dicts(cls, rows):
+        """Convert database rows straight to API dicts, skipping User hydration"""
+        users = []
+        for row in rows:
+            user = {field: row[field] for field in cls.PUBLIC_FIELDS}
+            user["is_active"] = bool(user["is_active"])
+            users.append(user)
+        return users
+
     def set_password(self, password):
         salt = secrets.token_hex(16)
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        self.password_hash = f"{salt}:{password_hash}"
+        self.password_hash = f"{SCRYPT_PREFIX}:{salt}:{_scrypt(password, salt)}"
 
     def check_password(self, password):
         if not self.password_hash or ":" not in self.password_hash:
             return False
 
-        salt, stored_hash = self.password_hash.split(":", 1)
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        return password_hash == stored_hash
+        if self.password_hash.startswith(f"{SCRYPT_PREFIX}:"):
+            _, salt, stored_hash = self.password_hash.split(":", 2)
+            password_hash = _scrypt(password, salt)
+        elif self.password_hash.startswith(f"{WRAPPED_PREFIX}:"):
+            _, legacy_salt, salt, stored_hash = self.password_hash.split(":", 3)
+            password_hash = _scrypt(_legacy_sha256(password, legacy_salt), salt)
+        else:
+            # Legacy "salt:sha256(password + salt)" hashes
+            salt, stored_hash = self.password_hash.split(":", 1)
+            password_hash = _legacy_sha256(password, salt)
+        return hmac.compare_digest(password_hash, stored_hash)
 
     def generate_api_key(self):
         """Generate API key for user"""
@@ -196,9 +279,9 @@ class User:
             "first_name": self.first_name,
             "last_name": self.last_name,
             "is_active": self.is_active,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "last_login": self.last_login.isoformat() if self.last_login else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "last_login": self.last_login,
         }
 
     def validate(self):
@@ -223,9 +306,6 @@ class User:
 class UserCreate:
 
     def __init__(self, username, email, password, first_name="", last_name="", **extra):
-        global TEMP_USER_DATA
-        TEMP_USER_DATA = {"username": username, "email": email}
-
         self.username = username
         self.email = email
         self.password = password
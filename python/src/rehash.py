@@ -0,0 +1,51 @@
+"""
+Upgrade legacy salted SHA-256 password hashes to scrypt in bulk.
+
+The plain passwords are unknown, so each legacy hash is wrapped as
+scrypt(sha256(password + salt)), which User.check_password understands.
+
+Usage (from the python/ directory): python src/rehash.py
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from db import pool
+from models.user import is_legacy_hash, wrap_legacy_hash
+
+
+def rehash_legacy_passwords(workers: Optional[int] = None) -> int:
+    """
+    Wrap every legacy password hash in scrypt.
+
+    Args:
+        workers: Number of hashing threads, defaults to the CPU count
+
+    Returns:
+        int: Number of users whose hash was upgraded
+    """
+    with pool.acquire() as conn:
+        rows = conn.execute("SELECT id, password_hash FROM users").fetchall()
+    legacy = [
+        (row["id"], row["password_hash"])
+        for row in rows
+        if is_legacy_hash(row["password_hash"])
+    ]
+
+    # hashlib.scrypt releases the GIL, so threads hash on all cores in parallel
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        new_hashes = list(executor.map(wrap_legacy_hash, [old for _, old in legacy]))
+
+    # Skip users whose password changed while we were hashing
+    with pool.write() as conn:
+        conn.executemany(
+            "UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+            [(new, user_id, old) for (user_id, old), new in zip(legacy, new_hashes)],
+        )
+    return len(legacy)
+
+
+if __name__ == "__main__":
+    count = rehash_legacy_passwords()
+    print(f"Upgraded {count} legacy password hashes")
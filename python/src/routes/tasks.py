@@ -1,8 +1,23 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, abort, jsonify, request
+from serialization import ResponseCache, negotiate_mimetype, read_json_body
 from services import task_service
 
 tasks_bp = Blueprint("tasks", __name__)
 
+# Serialized GET /tasks pages, keyed by query and task list version
+_list_cache = ResponseCache()
+
+
+def _parse_cursor(cursor):
+    """Parse a "<created_at>,<id>" task cursor, aborting with 400 if malformed"""
+    created_at, sep, last_id = cursor.rpartition(",")
+    if not sep or not created_at:
+        abort(400)
+    try:
+        return created_at, int(last_id)
+    except ValueError:
+        abort(400)
+
 
 @tasks_bp.route("/tasks", methods=["GET"])
 def get_tasks():
@@ -13,8 +28,18 @@ def get_tasks():
         "assigned_to": request.args.get("assigned_to"),
     }
 
-    tasks = task_service.get_tasks(filters)
-    return jsonify({"tasks": tasks})
+    limit = request.args.get("limit", task_service.DEFAULT_PAGE_SIZE, type=int)
+    cursor = request.args.get("cursor")
+    after = _parse_cursor(cursor) if cursor is not None else None
+
+    key = (tuple(filters.items()), limit, after, task_service.list_version())
+    mimetype = negotiate_mimetype()
+    body = _list_cache.get_or_render(
+        key,
+        lambda: task_service.get_tasks(filters, limit=limit, after=after),
+        mimetype,
+    )
+    return Response(body, mimetype=mimetype, headers={"Vary": "Accept"})
 
 
 @tasks_bp.route("/tasks/<task_id>", methods=["GET"])
@@ -31,7 +56,7 @@ def get_task(task_id):
 @tasks_bp.route("/tasks", methods=["POST"])
 def create_task():
     """Create new task"""
-    data = request.json
+    data = read_json_body()
     task = task_service.create_task(data)
     return jsonify(task)
 
@@ -39,7 +64,7 @@ def create_task():
 @tasks_bp.route("/tasks/<task_id>", methods=["PUT"])
 def update_task(task_id):
     """Update task"""
-    data = request.json
+    data = read_json_body()
 
     task = task_service.update_task(int(task_id), data)
 
@@ -1,14 +1,33 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, abort, jsonify, request
+from serialization import ResponseCache, negotiate_mimetype, read_json_body
 from services import user_service
 
 users_bp = Blueprint("users", __name__)
 
+# Serialized GET /users pages, keyed by query and user list version
+_list_cache = ResponseCache()
+
 
 @users_bp.route("/users", methods=["GET"])
 def get_users():
     """Get all users"""
-    users = user_service.get_users()
-    return jsonify({"users": users})
+    limit = request.args.get("limit", user_service.DEFAULT_PAGE_SIZE, type=int)
+    # Cursor is the id of the last user on the previous page
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        try:
+            cursor = int(cursor)
+        except ValueError:
+            abort(400)
+
+    key = (limit, cursor, user_service.list_version())
+    mimetype = negotiate_mimetype()
+    body = _list_cache.get_or_render(
+        key,
+        lambda: user_service.get_users(limit=limit, cursor=cursor),
+        mimetype,
+    )
+    return Response(body, mimetype=mimetype, headers={"Vary": "Accept"})
 
 
 @users_bp.route("/users/<user_id>", methods=["GET"])
@@ -25,7 +44,7 @@ def get_user(user_id):
 @users_bp.route("/users", methods=["POST"])
 def create_user():
     """Create new user"""
-    data = request.json
+    data = read_json_body()
 
     user = user_service.create_user(data)
 
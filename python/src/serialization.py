@@ -0,0 +1,94 @@
+import orjson
+import ormsgpack
+import threading
+from typing import Any, Callable, Hashable, Union
+from cachetools import LRUCache
+from flask import abort, request
+from flask.json.provider import JSONProvider
+
+# Largest JSON request body we accept (1 MiB)
+MAX_JSON_BODY = 1 << 20
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/msgpack"
+
+# Response body encoders by mimetype; JSON first so it wins for */*
+ENCODERS: dict[str, Callable[[Any], bytes]] = {
+    JSON_MIMETYPE: orjson.dumps,
+    MSGPACK_MIMETYPE: ormsgpack.packb,
+}
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Used by jsonify() and request.get_json(); orjson encodes large task/user
+    lists considerably faster than the stdlib json module.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
+class ResponseCache:
+    """
+    Small LRU of already-serialized response bodies.
+
+    Keys should include a data version (e.g. db.get_version()), so
+    writes make lookups miss instead of needing explicit invalidation.
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self._bodies = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get_or_render(
+        self, key: Hashable, render: Callable[[], Any], mimetype: str = JSON_MIMETYPE
+    ) -> bytes:
+        """
+        Return the cached body for key, rendering and storing it on a miss.
+
+        Args:
+            key: Cache key, including the data version
+            render: Builds the payload to serialize on a miss
+            mimetype: One of ENCODERS; each encoding is cached separately
+
+        Returns:
+            bytes: Encoded body
+        """
+        key = (key, mimetype)
+        with self._lock:
+            body = self._bodies.get(key)
+        if body is None:
+            body = ENCODERS[mimetype](render())
+            with self._lock:
+                self._bodies[key] = body
+        return body
+
+
+def negotiate_mimetype() -> str:
+    """
+    Pick the response encoding from the request's Accept header.
+
+    Returns:
+        str: MSGPACK_MIMETYPE if the client prefers it, JSON_MIMETYPE otherwise
+    """
+    return request.accept_mimetypes.best_match(ENCODERS, default=JSON_MIMETYPE)
+
+
+def read_json_body() -> Any:
+    """
+    Parse the current request body as JSON with orjson.
+
+    Aborts with 413 for bodies over MAX_JSON_BODY and 400 for invalid JSON.
+    """
+    if request.content_length and request.content_length > MAX_JSON_BODY:
+        abort(413)
+    try:
+        return orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        abort(400)
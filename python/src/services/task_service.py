@@ -1,21 +1,39 @@
-import asyncio
 from models.task import TaskCreate, TaskUpdate, Task
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
 
-def get_tasks(filters=None):
-    """Get all tasks with optional filters"""
+
+def get_tasks(filters=None, limit=DEFAULT_PAGE_SIZE, after=None):
+    """
+    Get one page of tasks with optional filters, newest first.
+
+    `after` is the (created_at, id) of the last task on the previous page,
+    as parsed from the "<created_at>,<id>" next_cursor.
+    """
     if filters is None:
         filters = {}
 
     status = filters.get("status")
+    priority = filters.get("priority")
     user_id = filters.get("assigned_to")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    rows = Task.find_all_rows(
+        user_id=user_id, status=status, priority=priority, limit=limit, after=after
+    )
+    result = Task.rows_to_dicts(rows)
+
+    next_cursor = None
+    if len(result) == limit:
+        last = result[-1]
+        next_cursor = f"{last['created_at']},{last['id']}"
+    return {"tasks": result, "next_cursor": next_cursor}
 
-    all_tasks = Task.find_all(user_id=user_id, status=status)
 
-    result = []
-    for t in all_tasks:
-        result.append(t.to_dict())
-    return result
+def list_version():
+    """Version of the task list; changes whenever any task is written"""
+    return Task.list_version()
 
 
 def get_task(task_id):
@@ -50,7 +68,7 @@ def update_task(task_id, data):
     task_data = TaskUpdate(**data)
 
     # Find existing task
-    existing = Task.find_by_id(task_id)
+    existing = Task.find_by_id(task_id, use_cache=False)
     if not existing:
         return None
 
@@ -74,7 +92,7 @@ def update_task(task_id, data):
 
 def delete_task(task_id):
     """Delete task"""
-    found = Task.find_by_id(task_id)
+    found = Task.find_by_id(task_id, use_cache=False)
     if found:
         found.delete()
         return True
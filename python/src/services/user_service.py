@@ -1,22 +1,30 @@
-import asyncio
 from models.user import UserCreate, User
-import sqlite3
+from db import pool
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
 
-def get_users():
-    """Get all users"""
-    conn = sqlite3.connect("taskflow.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users")
-    rows = cursor.fetchall()
-    conn.close()
+_LIST_PAGE_SQL = "SELECT * FROM users WHERE id > ? ORDER BY id LIMIT ?"
 
-    users_list = []
-    for row in rows:
-        u = User._from_row(row)
-        users_list.append(u.to_dict())
 
-    return users_list
+def get_users(limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """Get one page of users ordered by id"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    with pool.acquire() as conn:
+        db_cursor = conn.cursor()
+        db_cursor.execute(_LIST_PAGE_SQL, (cursor or 0, limit))
+        rows = db_cursor.fetchall()
+
+    users_list = User.rows_to_dicts(rows)
+
+    next_cursor = users_list[-1]["id"] if len(users_list) == limit else None
+    return {"users": users_list, "next_cursor": next_cursor}
+
+
+def list_version():
+    """Version of the user list; changes whenever any user is written"""
+    return User.list_version()
 
 
 def get_user(user_id):
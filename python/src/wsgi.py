@@ -0,0 +1,7 @@
+# WSGI entry point for gunicorn with gevent workers.
+# Monkey-patching must happen before anything else imports socket/threading.
+from gevent import monkey
+
+monkey.patch_all()
+
+from app import app  # noqa: E402